@@ -1,27 +1,135 @@
 ﻿from __future__ import annotations
 
 import argparse
+import multiprocessing
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Iterable, Tuple
 
 from PIL import Image
 
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:  # optional libjpeg-turbo encoder, Pillow is the fallback
+    simplejpeg = None
+
+try:
+    import mozjpeg_lossless_optimization
+except ImportError:  # optional jpegtran-style lossless optimizer
+    mozjpeg_lossless_optimization = None
+
+
+def _iter_image_entries(src_dir: str) -> Iterable[Tuple[str, int]]:
+    # scandir reuses the file-type info the OS returned with the directory
+    # listing, so no extra stat() per entry, and the size comes along for
+    # free from the same lookup.
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            # One C-level endswith beats splitext + lower + membership per
+            # entry; splitext runs later, only for files that pass.
+            if entry.name.lower().endswith((".jpg", ".jpeg", ".png")):
+                yield entry.path, entry.stat(follow_symlinks=False).st_size
+
 
 def iter_images(src_dir: str) -> Iterable[str]:
-    for name in os.listdir(src_dir):
-        path = os.path.join(src_dir, name)
-        if not os.path.isfile(path):
-            continue
-        ext = os.path.splitext(name)[1].lower()
-        if ext in (".jpg", ".jpeg", ".png"):
-            yield path
+    for path, _ in _iter_image_entries(src_dir):
+        yield path
+
+
+def _advise_sequential(path: str) -> None:
+    # Tell the kernel to read the file ahead aggressively so the next
+    # chunks stream in while the CPU is busy decoding/encoding the current
+    # ones. Linux only; a no-op elsewhere.
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(
+            fd, 0, 0, os.POSIX_FADV_SEQUENTIAL | os.POSIX_FADV_WILLNEED
+        )
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _fast_copy(src: str, dst: str) -> None:
+    # Copy inside the kernel where possible: copy_file_range can reflink on
+    # XFS/btrfs (O(1)), sendfile is zero-copy, and shutil.copy2 stays the
+    # portable fallback. Preserve mtime like copy2 does.
+    try:
+        st = os.stat(src)
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            remaining = st.st_size
+            if hasattr(os, "copy_file_range"):
+                while remaining > 0:
+                    copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                    if copied == 0:
+                        raise OSError("copy_file_range made no progress")
+                    remaining -= copied
+            elif hasattr(os, "sendfile"):
+                offset = 0
+                while remaining > 0:
+                    sent = os.sendfile(dst_fd, src_fd, offset, remaining)
+                    if sent == 0:
+                        raise OSError("sendfile made no progress")
+                    offset += sent
+                    remaining -= sent
+            else:
+                shutil.copyfileobj(fsrc, fdst)
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_has_alpha(path: str) -> bool:
+    # Walk the chunk headers up to IDAT: color type 4/6 (gray+alpha, RGBA)
+    # or a tRNS chunk means the image can carry transparency. Anything
+    # unexpected returns True so the caller falls back to the decoded
+    # has_transparency check.
+    try:
+        with open(path, "rb") as f:
+            if f.read(8) != _PNG_SIGNATURE:
+                return True
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return True
+                length = int.from_bytes(header[:4], "big")
+                chunk_type = header[4:8]
+                if chunk_type == b"IHDR":
+                    data = f.read(length)
+                    if len(data) < 10:
+                        return True
+                    if data[9] in (4, 6):
+                        return True
+                    f.seek(4, 1)  # CRC
+                elif chunk_type == b"tRNS":
+                    return True
+                elif chunk_type == b"IDAT":
+                    return False
+                else:
+                    f.seek(length + 4, 1)
+    except OSError:
+        return True
 
 
 def has_transparency(img: Image.Image) -> bool:
     if img.mode in ("RGBA", "LA"):
-        alpha = img.getchannel("A")
-        return alpha.getextrema()[0] < 255
+        # getextrema() scans all channels in one pass; the last tuple is
+        # alpha. Avoids materializing a separate alpha plane via getchannel.
+        return img.getextrema()[-1][0] < 255
     if img.mode == "P":
         return "transparency" in img.info
     return False
@@ -31,62 +139,198 @@ def compress_dir(src_dir: str, dst_dir: str, quality: int) -> Tuple[int, int, in
     return compress_dir_with_progress(src_dir, dst_dir, quality, None)
 
 
+# Standard IJG luminance quantization table (quality 50 baseline).
+_STD_LUMINANCE_QT = (
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+)
+
+
+def _scaled_luminance_qt(quality: int) -> Tuple[int, ...]:
+    # IJG scaling with the same 1..255 clamp libjpeg applies.
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return tuple(
+        max(1, min(255, (v * scale + 50) // 100)) for v in _STD_LUMINANCE_QT
+    )
+
+
+_REF_QT_BY_QUALITY = tuple(_scaled_luminance_qt(q) for q in range(1, 101))
+
+
+def _estimate_jpeg_quality(img: Image.Image) -> int | None:
+    # Match the luminance table from the file header against the reference
+    # table generated for each candidate quality; the closest one wins.
+    # Inverting the quality->scale formula from the raw table sum does not
+    # survive the 255 clamp, which saturates low-quality tables and pins
+    # every estimate above ~10. No pixel decode needed either way.
+    tables = getattr(img, "quantization", None)
+    if not tables or 0 not in tables:
+        return None
+    table = tables[0]
+    best_quality = None
+    best_diff = None
+    for quality_idx, ref in enumerate(_REF_QT_BY_QUALITY):
+        diff = sum(abs(a - b) for a, b in zip(table, ref))
+        if best_diff is None or diff < best_diff:
+            best_quality = quality_idx + 1
+            best_diff = diff
+    return best_quality
+
+
+def _save_jpeg(img: Image.Image, out_path: str, quality: int, exif, icc) -> None:
+    # simplejpeg goes straight to libjpeg-turbo, which is noticeably faster
+    # than Pillow's encoder, but it cannot embed EXIF/ICC blobs and only
+    # writes baseline (non-progressive) JPEG. Use it only when there is no
+    # metadata to carry over. 4:2:0 subsampling matches what Pillow picks
+    # at these qualities.
+    if simplejpeg is not None and img.mode == "RGB" and not exif and not icc:
+        jpeg_bytes = simplejpeg.encode_jpeg(
+            np.asarray(img), quality=quality, colorspace="RGB",
+            colorsubsampling="420",
+        )
+        with open(out_path, "wb") as f:
+            f.write(jpeg_bytes)
+        return
+    # Pillow >= 10 rejects exif=None / icc_profile=None, so pass an empty
+    # EXIF blob and only forward an ICC profile that actually exists.
+    icc_kwargs = {"icc_profile": icc} if icc else {}
+    img.save(
+        out_path,
+        format="JPEG",
+        quality=quality,
+        # The extra optimize Huffman pass costs a second scan of the data
+        # and barely helps at the low qualities this tool defaults to;
+        # progressive already picks good Huffman tables.
+        optimize=quality >= 60,
+        progressive=True,
+        exif=exif or b"",
+        **icc_kwargs,
+    )
+
+
+def _compress_one(
+    path: str,
+    dst_dir: str,
+    quality: int,
+    src_size: int,
+    png_jpeg_name: str | None = None,
+) -> Tuple[int, int, str]:
+    # png_jpeg_name is the pre-assigned output name to use if this PNG
+    # turns into a JPEG; the caller picks one that cannot collide with any
+    # other file in the batch.
+    name = os.path.basename(path)
+    base, ext = os.path.splitext(name)
+    ext = ext.lower()
+    out_path = os.path.join(dst_dir, name)
+    out_is_jpeg = ext in (".jpg", ".jpeg")
+    # Decide the PNG output format from the chunk headers before Pillow
+    # opens the file: clearly opaque PNGs go straight to the JPEG path and
+    # are decoded exactly once, by the convert below.
+    png_may_have_alpha = ext == ".png" and _png_has_alpha(path)
+    _advise_sequential(path)
+    with Image.open(path) as img:
+        if out_is_jpeg:
+            est_quality = _estimate_jpeg_quality(img)
+            if est_quality is not None and est_quality <= quality:
+                # Already compressed at or below the target; re-encoding
+                # would only grow it, so skip the decode/encode pass.
+                # mozjpeg can still shave bytes losslessly by rewriting the
+                # Huffman tables, without another quantization generation.
+                if mozjpeg_lossless_optimization is not None:
+                    with open(path, "rb") as f:
+                        src_bytes = f.read()
+                    opt_bytes = mozjpeg_lossless_optimization.optimize(src_bytes)
+                    if len(opt_bytes) < src_size:
+                        with open(out_path, "wb") as f:
+                            f.write(opt_bytes)
+                        return src_size, len(opt_bytes), out_path
+                _fast_copy(path, out_path)
+                return src_size, src_size, out_path
+            # Ask libjpeg to hand us RGB straight from the decoder where it
+            # can, instead of converting in a second full-image pass below.
+            img.draft("RGB", img.size)
+        if ext == ".png":
+            if png_may_have_alpha and has_transparency(img):
+                out_path = os.path.join(dst_dir, base + ".png")
+                img.save(out_path, format="PNG", optimize=True, compress_level=9)
+            else:
+                out_path = os.path.join(dst_dir, png_jpeg_name or base + ".jpg")
+                out_is_jpeg = True
+        original = img
+        if out_is_jpeg and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        try:
+            exif = img.info.get("exif")
+            icc = img.info.get("icc_profile")
+            if out_is_jpeg:
+                _save_jpeg(img, out_path, quality, exif, icc)
+        finally:
+            # convert() may have rebound img to a copy the with-statement
+            # doesn't own; close that copy here so the decoded bitmap is
+            # freed before the size-compare/copy phase below. The original
+            # is left to the with-statement, which closes it exactly once.
+            if img is not original:
+                img.close()
+    # If something went wrong and output is bigger, keep original.
+    if os.path.getsize(out_path) > src_size:
+        if out_path != os.path.join(dst_dir, name):
+            try:
+                os.remove(out_path)
+            except OSError:
+                pass
+            out_path = os.path.join(dst_dir, name)
+        _fast_copy(path, out_path)
+    return src_size, os.path.getsize(out_path), out_path
+
+
 def compress_dir_with_progress(
     src_dir: str, dst_dir: str, quality: int, progress_cb
 ) -> Tuple[int, int, int]:
     os.makedirs(dst_dir, exist_ok=True)
-    files = list(iter_images(src_dir))
+    files = list(_iter_image_entries(src_dir))
     total = len(files)
     if progress_cb:
         progress_cb(0, total)
-    out_paths = []
-    for path in files:
-        name = os.path.basename(path)
-        base, ext = os.path.splitext(name)
-        ext = ext.lower()
-        out_path = os.path.join(dst_dir, name)
-        out_is_jpeg = ext in (".jpg", ".jpeg")
-        with Image.open(path) as img:
-            if ext == ".png":
-                if has_transparency(img):
-                    out_path = os.path.join(dst_dir, base + ".png")
-                    img.save(out_path, format="PNG", optimize=True, compress_level=9)
-                    out_is_jpeg = False
-                else:
-                    out_path = os.path.join(dst_dir, base + ".jpg")
-                    if img.mode not in ("RGB", "L"):
-                        img = img.convert("RGB")
-                    out_is_jpeg = True
-            if out_is_jpeg:
-                if img.mode not in ("RGB", "L"):
-                    img = img.convert("RGB")
-            exif = img.info.get("exif")
-            icc = img.info.get("icc_profile")
-            if out_is_jpeg:
-                img.save(
-                    out_path,
-                    format="JPEG",
-                    quality=quality,
-                    optimize=True,
-                    progressive=True,
-                    exif=exif,
-                    icc_profile=icc,
-                )
-        # If something went wrong and output is bigger, keep original.
-        if os.path.getsize(out_path) > os.path.getsize(path):
-            if out_path != os.path.join(dst_dir, name):
-                try:
-                    os.remove(out_path)
-                except OSError:
-                    pass
-                out_path = os.path.join(dst_dir, name)
-            shutil.copy2(path, out_path)
-        out_paths.append(out_path)
-        if progress_cb:
-            progress_cb(1, total, step=True)
-    return len(files), sum(os.path.getsize(p) for p in files), sum(
-        os.path.getsize(p) for p in out_paths
-    )
+    src_bytes = 0
+    dst_bytes = 0
+    # Assign PNG-to-JPEG output names up front: a.png would otherwise write
+    # dst/a.jpg concurrently with a source a.jpg, and two workers
+    # interleaving into the same file corrupt it. Probing is case-blind for
+    # case-insensitive filesystems.
+    claimed = {os.path.normcase(os.path.basename(path)) for path, _ in files}
+    png_jpeg_names = {}
+    for path, _ in files:
+        base, ext = os.path.splitext(os.path.basename(path))
+        if ext.lower() != ".png":
+            continue
+        candidate = base + ".jpg"
+        counter = 1
+        while os.path.normcase(candidate) in claimed:
+            candidate = f"{base}_{counter}.jpg"
+            counter += 1
+        claimed.add(os.path.normcase(candidate))
+        png_jpeg_names[path] = candidate
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        futures = [
+            pool.submit(
+                _compress_one, path, dst_dir, quality, size,
+                png_jpeg_names.get(path),
+            )
+            for path, size in files
+        ]
+        for future in as_completed(futures):
+            src_size, out_size, _ = future.result()
+            src_bytes += src_size
+            dst_bytes += out_size
+            if progress_cb:
+                progress_cb(1, total, step=True)
+    return total, src_bytes, dst_bytes
 
 
 def run_cli(args: argparse.Namespace) -> None:
@@ -100,6 +344,7 @@ def run_cli(args: argparse.Namespace) -> None:
 
 def run_gui() -> None:
     import threading
+    import time
     import tkinter as tk
     from tkinter import filedialog, messagebox, ttk
 
@@ -122,20 +367,33 @@ def run_gui() -> None:
         browse_dst_btn.configure(state=state)
         start_btn.configure(state=state)
 
+    progress_lock = threading.Lock()
+    progress_state = {"done": 0, "last_post": 0.0}
+
     def progress_cb(delta: int, total: int, step: bool = False) -> None:
+        with progress_lock:
+            if step:
+                progress_state["done"] += delta
+            else:
+                progress_state["done"] = delta
+            done = progress_state["done"]
+            # Coalesce posts to ~20 Hz so thousands of small files don't
+            # clog the Tk event loop; the final step always renders.
+            now = time.monotonic()
+            if done < total and now - progress_state["last_post"] < 0.05:
+                return
+            progress_state["last_post"] = now
+
         def _update() -> None:
             if total == 0:
                 progress_var.set(0)
                 progress_label.configure(text="진행률: 0/0")
                 return
-            if step:
-                progress_var.set(min(total, progress_var.get() + delta))
-            else:
-                progress_var.set(delta)
+            with progress_lock:
+                done_now = min(total, progress_state["done"])
+            progress_var.set(done_now)
             progress_bar.configure(maximum=total)
-            progress_label.configure(
-                text=f"진행률: {int(progress_var.get())}/{total}"
-            )
+            progress_label.configure(text=f"진행률: {done_now}/{total}")
 
         root.after(0, _update)
 
@@ -178,6 +436,9 @@ def run_gui() -> None:
             messagebox.showerror("오류", "품질은 1~95 사이여야 합니다.")
             return
 
+        with progress_lock:
+            progress_state["done"] = 0
+            progress_state["last_post"] = 0.0
         progress_var.set(0)
         progress_label.configure(text="진행률: 0/0")
         set_ui_state(False)
@@ -245,4 +506,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Required for ProcessPoolExecutor in the pyinstaller --onefile build.
+    multiprocessing.freeze_support()
     main()
@@ -2,13 +2,35 @@ import os
 import re
 import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Tuple
 
+_SYSNAME_RE = re.compile(rb"SysName\s*:\s*([A-Za-z0-9._-]+)", re.IGNORECASE)
+
+
+def _extract_hostname(file_path: str) -> str | None:
+    with open(file_path, "rb") as f:
+        if hasattr(os, "posix_fadvise"):
+            try:
+                # Pre-fault the header window we are about to scan (Linux
+                # only); overlaps disk readahead with the other workers.
+                os.posix_fadvise(
+                    f.fileno(), 0, 64 * 1024, os.POSIX_FADV_WILLNEED
+                )
+            except OSError:
+                pass
+        # SysName sits in the log header, so one capped read is enough even
+        # for huge logs: a single syscall and a single allocation.
+        head = f.read(64 * 1024)
+    m = _SYSNAME_RE.search(head)
+    if m:
+        return m.group(1).decode("ascii")
+    return None
+
 
 def rename_logs_by_hostname(
     folder_path: str, log_cb: Callable[[str], None] | None = None
 ) -> Tuple[int, int, int]:
-    sysname_re = re.compile(r"SysName\s*:\s*([A-Za-z0-9._-]+)", re.IGNORECASE)
     renamed = 0
     skipped = 0
     failed = 0
@@ -19,23 +41,34 @@ def rename_logs_by_hostname(
         else:
             print(msg)
 
-    for filename in os.listdir(folder_path):
-        if not filename.lower().endswith(".log"):
-            continue
-
-        file_path = os.path.join(folder_path, filename)
-        if not os.path.isfile(file_path):
-            continue
-
-        hostname = None
-
+    with os.scandir(folder_path) as entries:
+        log_files = [
+            (entry.name, entry.path)
+            for entry in entries
+            if entry.name.lower().endswith(".log")
+            and entry.is_file(follow_symlinks=False)
+        ]
+
+    # Reading releases the GIL, so overlap disk latency across files. The
+    # rename phase below stays single-threaded to keep the collision
+    # counters deterministic.
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_extract_hostname, file_path)
+            for _, file_path in log_files
+        ]
+
+    # One listing up front; collision probing below is then a set lookup
+    # instead of a stat() per candidate name. Names are normcase'd so the
+    # probe is case-insensitive on Windows, matching how NTFS resolves
+    # os.path.exists.
+    with os.scandir(folder_path) as entries:
+        existing = {os.path.normcase(entry.name) for entry in entries}
+
+    for (filename, file_path), future in zip(log_files, futures):
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    m = sysname_re.search(line)
-                    if m:
-                        hostname = m.group(1)
-                        break
+            hostname = future.result()
         except Exception as e:
             log(f"[SKIP] Could not read {filename}: {e}")
             skipped += 1
@@ -57,13 +90,15 @@ def rename_logs_by_hostname(
             continue
 
         counter = 1
-        while os.path.exists(new_path):
+        while os.path.normcase(new_filename) in existing:
             new_filename = f"{base}_{counter}{ext}"
-            new_path = os.path.join(folder_path, new_filename)
             counter += 1
+        new_path = os.path.join(folder_path, new_filename)
 
         try:
             os.replace(file_path, new_path)
+            existing.discard(os.path.normcase(filename))
+            existing.add(os.path.normcase(new_filename))
             log(f"[RENAME] {filename} -> {new_filename}")
             renamed += 1
         except Exception as e:
@@ -74,6 +109,7 @@ def rename_logs_by_hostname(
 
 
 def run_gui() -> None:
+    import queue
     import tkinter as tk
     from tkinter import filedialog, messagebox, scrolledtext
 
@@ -88,11 +124,21 @@ def run_gui() -> None:
         browse_btn.configure(state=state)
         start_btn.configure(state=state)
 
-    def append_log(msg: str) -> None:
-        log_box.configure(state="normal")
-        log_box.insert(tk.END, msg + "\n")
-        log_box.see(tk.END)
-        log_box.configure(state="disabled")
+    def drain_logs() -> None:
+        # One timer tick inserts every pending message at once, instead of
+        # one root.after + widget reconfigure per log line.
+        msgs = []
+        while True:
+            try:
+                msgs.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if msgs:
+            log_box.configure(state="normal")
+            log_box.insert(tk.END, "\n".join(msgs) + "\n")
+            log_box.see(tk.END)
+            log_box.configure(state="disabled")
+        root.after(100, drain_logs)
 
     def run_worker(folder: str) -> None:
         try:
@@ -112,7 +158,7 @@ def run_gui() -> None:
         root.after(0, lambda: set_ui_state(True))
 
     def log_cb(msg: str) -> None:
-        root.after(0, lambda: append_log(msg))
+        log_queue.put(msg)
 
     def run() -> None:
         folder = folder_var.get().strip()
@@ -131,6 +177,7 @@ def run_gui() -> None:
     root.resizable(False, False)
 
     folder_var = tk.StringVar()
+    log_queue: queue.Queue[str] = queue.Queue()
 
     pad = {"padx": 8, "pady": 6}
 
@@ -146,6 +193,7 @@ def run_gui() -> None:
     start_btn = tk.Button(root, text="이름 변경 시작", command=run, width=20)
     start_btn.grid(row=2, column=0, columnspan=3, pady=12)
 
+    root.after(100, drain_logs)
     root.mainloop()
 
 